@@ -17,9 +17,22 @@ Features included:
 """
 
 import os
+import re
+import io
 import sys
+import csv
 import json
+import mmap
+import time
+import struct
+import bisect
+import itertools
 import random
+import sqlite3
+import tempfile
+import zlib
+from contextlib import contextmanager, closing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
 from typing import List, Tuple
 
@@ -33,6 +46,18 @@ FOOD_DB_FILE = "food_database.csv"
 USER_DB_FILE = "users.csv"            # stores user profiles
 LOGS_FILE = "nutriscale_logs.csv"     # daily logs per user
 RECOMMENDATIONS_FILE = "custom_recommendations.csv"
+RECOMMENDATIONS_INDEX_FILE = "custom_recommendations_index.sqlite"   # per-user row offsets
+FOOD_CHANGES_FILE = "food_changes.csv"          # append-only catalog change log
+FOOD_CATALOG_META_FILE = "food_catalog_meta.json"
+FOOD_CATALOG_BIN_FILE = "food_catalog.bin"     # compiled, mmap-able copy of FOOD_DB_FILE
+FOOD_CHANGELOG_MAX_ENTRIES = 5000   # compact the change log once it grows past this...
+FOOD_CHANGELOG_KEEP_ENTRIES = 1000  # ...keeping only the most recent entries
+TARGETS_FORMULA_VERSION = 1        # bump when a formula below changes -> stored targets recomputed
+SUGGESTION_COUNT = 3                # alternative meal plans shown at login
+SUGGESTION_BUDGET_MS = 20           # wall-clock budget for the suggestion search
+SUGGESTION_MAX_CANDIDATES = 250     # larger catalogs are searched on an even sample of rows
+SUGGESTION_MAX_SHARED = 0.5         # alternatives share at most half of the smaller plan's foods
+ADHERENCE_BAND = 0.10               # ±10% of recommended calories (custom_meal_flow + adherence report)
 
 # Activity multipliers (Mifflin-St Jeor based TDEE)
 ACTIVITY_MULTIPLIERS = {
@@ -125,27 +150,74 @@ def merge_sort(arr):
 # -------------------------
 # Utility helpers
 # -------------------------
-def ensure_food_db():
+def ensure_food_db_file():
+    """Create the default food database if missing, without parsing it"""
     if not os.path.exists(FOOD_DB_FILE):
-        init_food_database()
+        with file_lock(FOOD_DB_FILE):
+            if not os.path.exists(FOOD_DB_FILE):   # another process may have created it
+                _init_food_database_locked()
+
+def ensure_food_db():
+    ensure_food_db_file()
     return pd.read_csv(FOOD_DB_FILE)
 
+def _create_csv(path, columns):
+    """Create a header-only CSV; exclusive create so concurrent processes cannot clobber it"""
+    try:
+        with open(path, "x", newline="", encoding="utf-8") as f:
+            f.write(",".join(columns) + "\n")
+    except FileExistsError:
+        pass
+
 def ensure_user_db():
     if not os.path.exists(USER_DB_FILE):
-        df = pd.DataFrame(columns=["username","name","age","gender","height_cm","weight_kg","target_weight","activity"])
-        df.to_csv(USER_DB_FILE, index=False)
+        _create_csv(USER_DB_FILE, PROFILE_COLUMNS + TARGET_FIELDS + TARGET_META_COLUMNS)
     return pd.read_csv(USER_DB_FILE)
 
 def ensure_logs():
     if not os.path.exists(LOGS_FILE):
-        df = pd.DataFrame(columns=["date","username","foods","total_calories","weight"])
-        df.to_csv(LOGS_FILE, index=False)
+        _create_csv(LOGS_FILE, ["date","username","foods","total_calories","weight"])
     return pd.read_csv(LOGS_FILE)
 
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on `path`.lock, shared by every NutriScale process"""
+    with open(path + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def atomic_write_bytes(path, data: bytes):
+    """Write via a uniquely named temp file in the same directory, then rename over `path`"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def ensure_recommendations_file():
+    """Create the recommendations CSV (header only) without reading it back"""
+    _create_csv(RECOMMENDATIONS_FILE, ["username", "date_created", "recommendations"])
+
 def ensure_recommendations():
-    if not os.path.exists(RECOMMENDATIONS_FILE):
-        df = pd.DataFrame(columns=["username", "date_created", "recommendations"])
-        df.to_csv(RECOMMENDATIONS_FILE, index=False)
+    ensure_recommendations_file()
     return pd.read_csv(RECOMMENDATIONS_FILE)
 
 
@@ -154,6 +226,10 @@ def ensure_recommendations():
 # -------------------------
 @log_action
 def init_food_database():
+    with file_lock(FOOD_DB_FILE):
+        _init_food_database_locked()
+
+def _init_food_database_locked():
     data = [
         {"Food":"Oatmeal","Calories":150},{"Food":"Eggs","Calories":155},
         {"Food":"Chicken Breast","Calories":200},{"Food":"Rice","Calories":180},
@@ -205,7 +281,7 @@ def init_food_database():
         {"Food":"Protein Shake","Calories":200}
     ]
     df = pd.DataFrame(data)
-    df.to_csv(FOOD_DB_FILE, index=False)
+    _commit_food_db_locked(df, [("reset", "", None, None)])
     print("✅ Food database created with variety.")
 
 # -------------------------
@@ -290,19 +366,178 @@ def macronutrient_breakdown(calories: int, protein_ratio=0.25, fat_ratio=0.25, c
     carbs_g = round(c_cal / 4)
     return {"protein_g": protein_g, "fat_g": fat_g, "carbs_g": carbs_g}
 
+# -------------------------
+# Stored profile targets (dependency-aware recompute)
+# -------------------------
+# Derived targets live in users.csv next to the profile. TARGET_FORMULAS lists each
+# target's inputs (profile fields or other targets) in dependency order, with a
+# vectorised formula matching the scalar helpers above. When profile fields change only
+# the targets downstream of them are recomputed; targets_version counts recomputes per
+# user and targets_formula records TARGETS_FORMULA_VERSION at the time.
+PROFILE_COLUMNS = ["username","name","age","gender","height_cm","weight_kg","target_weight","activity"]
+EDITABLE_PROFILE_FIELDS = ["name","age","gender","height_cm","weight_kg","target_weight","activity"]
+TARGET_META_COLUMNS = ["targets_version", "targets_formula"]
+
+def _round_like_python(series, ndigits):
+    # np.round can differ from round() on values that sit right at a half
+    return series.map(lambda v: round(v, ndigits) if pd.notna(v) else v).astype(float)
+
+def _bmi_formula(d):
+    h_m = d['height_cm'].astype(float) / 100.0
+    return _round_like_python(d['weight_kg'].astype(float) / (h_m * h_m).where(h_m > 0), 2)
+
+def _bmr_formula(d):
+    gender = d['gender'].astype(str).str.strip().str.lower()
+    base = 10*d['weight_kg'].astype(float) + 6.25*d['height_cm'].astype(float) - 5*d['age'].astype(float)
+    bmr_m, bmr_f = base + 5, base - 161
+    bmr = np.where(gender.str.startswith('m'), bmr_m,
+                   np.where(gender.str.startswith('f'), bmr_f, (bmr_m + bmr_f) / 2.0))
+    return _round_like_python(pd.Series(bmr, index=d.index), 2)
+
+def _recommended_calories_formula(d):
+    tdee = d['tdee'].astype(float)
+    weight = d['weight_kg'].astype(float)
+    target = d['target_weight'].astype(float)
+    rec = np.where(target < weight, tdee - 500, np.where(target > weight, tdee + 500, tdee))
+    return pd.Series(np.maximum(np.round(rec), 1000), index=d.index).astype("Int64")
+
+TARGET_FORMULAS = {
+    "bmi": (("weight_kg", "height_cm"), _bmi_formula),
+    "bmr": (("weight_kg", "height_cm", "age", "gender"), _bmr_formula),
+    "tdee": (("bmr", "activity"), lambda d: (
+        d['bmr'].astype(float)
+        * d['activity'].astype(str).str.strip().str.lower().map(ACTIVITY_MULTIPLIERS).fillna(1.2)).round(0)),
+    "recommended_calories": (("tdee", "weight_kg", "target_weight"), _recommended_calories_formula),
+    "protein_g": (("recommended_calories",), lambda d: (d['recommended_calories'] * 0.25 / 4).round().astype("Int64")),
+    "fat_g": (("recommended_calories",), lambda d: (d['recommended_calories'] * 0.25 / 9).round().astype("Int64")),
+    "carbs_g": (("recommended_calories",), lambda d: (d['recommended_calories'] * 0.5 / 4).round().astype("Int64")),
+}
+TARGET_FIELDS = list(TARGET_FORMULAS)
+
+def affected_targets(changed_fields) -> List[str]:
+    """Targets that depend (directly or transitively) on any of the changed fields"""
+    dirty = set(changed_fields)
+    affected = []
+    for field, (deps, _) in TARGET_FORMULAS.items():
+        if dirty.intersection(deps):
+            dirty.add(field)
+            affected.append(field)
+    return affected
+
+def compute_targets(frame: pd.DataFrame, fields=None) -> pd.DataFrame:
+    """Return a copy of `frame` with `fields` (default: all targets) recomputed in order"""
+    frame = frame.copy()
+    wanted = set(TARGET_FIELDS if fields is None else fields)
+    for field, (_, formula) in TARGET_FORMULAS.items():
+        if field in wanted:
+            frame[field] = formula(frame)
+    return frame
+
+def _with_target_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of df with every target column present as float (the caller's frame is untouched)"""
+    df = df.copy()
+    for c in TARGET_FIELDS + TARGET_META_COLUMNS:
+        if c not in df.columns:
+            df[c] = np.nan
+    for c in TARGET_FIELDS + TARGET_META_COLUMNS:
+        df[c] = df[c].astype(float)
+    return df
+
+def _save_user_db(df: pd.DataFrame):
+    """Write users.csv (atomically) with whole-number targets stored as integers"""
+    df = df.copy()
+    for c in ["recommended_calories", "protein_g", "fat_g", "carbs_g"] + TARGET_META_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].round().astype("Int64")
+    atomic_write_bytes(USER_DB_FILE, df.to_csv(index=False).encode("utf-8"))
+
+def _stale_target_rows(df: pd.DataFrame) -> pd.Series:
+    """Rows never computed, or computed with an older TARGETS_FORMULA_VERSION"""
+    return df['targets_version'].isna() | (df['targets_formula'] != TARGETS_FORMULA_VERSION)
+
+def _store_targets(df: pd.DataFrame, mask, fields) -> pd.DataFrame:
+    """Recompute `fields` for rows in `mask` (in place on df) and bump their version"""
+    if fields:
+        fresh = compute_targets(df.loc[mask], fields)
+        for f in fields:
+            df.loc[mask, f] = fresh[f].astype(float)
+    df.loc[mask, 'targets_version'] = df.loc[mask, 'targets_version'].fillna(0) + 1
+    df.loc[mask, 'targets_formula'] = TARGETS_FORMULA_VERSION
+    return df
+
+def user_targets_frame(df_users: pd.DataFrame) -> pd.DataFrame:
+    """Users with stored targets; stale rows are recomputed in memory (not saved)"""
+    df = _with_target_columns(df_users)
+    stale = _stale_target_rows(df)
+    if stale.any():
+        fresh = compute_targets(df.loc[stale])
+        for f in TARGET_FIELDS:
+            df.loc[stale, f] = fresh[f].astype(float)
+    return df
+
+@log_action
+def backfill_user_targets():
+    """Compute and save targets for profiles that have none or were computed by old formulas"""
+    ensure_user_db()
+    with file_lock(USER_DB_FILE):
+        df = _with_target_columns(pd.read_csv(USER_DB_FILE))
+        stale = _stale_target_rows(df)
+        if stale.any():
+            _save_user_db(_store_targets(df, stale, TARGET_FIELDS))
+    return int(stale.sum())
+
+def get_user_targets(user: dict) -> dict:
+    """Targets for a profile dict (from find_user); recomputes and saves them if stale"""
+    stale = (pd.isna(user.get('targets_version'))
+             or user.get('targets_formula') != TARGETS_FORMULA_VERSION)
+    if stale:
+        with file_lock(USER_DB_FILE):
+            df = _with_target_columns(pd.read_csv(USER_DB_FILE))
+            mask = df['username'].str.lower() == str(user['username']).lower()
+            df = _store_targets(df, mask, TARGET_FIELDS)
+            _save_user_db(df)
+        user = df.loc[mask].iloc[0].to_dict()
+    return {f: user[f] for f in TARGET_FIELDS + TARGET_META_COLUMNS}
+
+@log_action
+def check_user_targets(df_users: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Verify stored targets against the formulas. Returns one row per problem:
+    username, field, stored, expected (field 'targets_formula' = stale formula version).
+    """
+    df = _with_target_columns(ensure_user_db() if df_users is None else df_users)
+    expected = compute_targets(df)
+    problems = []
+    stale = df['targets_formula'] != TARGETS_FORMULA_VERSION
+    for i in df.index[stale]:
+        problems.append((df.at[i, 'username'], 'targets_formula', df.at[i, 'targets_formula'],
+                         TARGETS_FORMULA_VERSION))
+    for f in TARGET_FIELDS:
+        stored = df[f].astype(float)
+        exp = expected[f].astype(float)
+        bad = ~(np.isclose(stored, exp, atol=1e-6) | (stored.isna() & exp.isna())) & ~stale
+        for i in df.index[bad]:
+            problems.append((df.at[i, 'username'], f, df.at[i, f], exp[i]))
+    return pd.DataFrame(problems, columns=["username", "field", "stored", "expected"])
+
 # -------------------------
 # Persistence: Users, Food DB, Logs
 # -------------------------
 @log_action
 def create_user_profile(username, name, age, gender, height_cm, weight_kg, target_weight, activity):
-    df = ensure_user_db()
-    if username.lower() in df['username'].str.lower().tolist():
-        print("⚠️ Username exists.")
-        return False
+    ensure_user_db()
     new = {"username": username, "name": name, "age": age, "gender": gender,
            "height_cm": height_cm, "weight_kg": weight_kg, "target_weight": target_weight, "activity": activity}
-    df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-    df.to_csv(USER_DB_FILE, index=False)
+    new_row = compute_targets(pd.DataFrame([new]))
+    new_row['targets_version'] = 1
+    new_row['targets_formula'] = TARGETS_FORMULA_VERSION
+    with file_lock(USER_DB_FILE):
+        df = pd.read_csv(USER_DB_FILE)
+        if username.lower() in df['username'].astype(str).str.lower().tolist():
+            print("⚠️ Username exists.")
+            return False
+        df = pd.concat([_with_target_columns(df), _with_target_columns(new_row)], ignore_index=True)
+        _save_user_db(df)
     print("✅ User created.")
     return True
 
@@ -328,15 +563,59 @@ def view_registered_users():
     print("========================\n")
 
 
+def verify_user_targets_flow():
+    problems = check_user_targets()
+    if problems.empty:
+        print("✅ All stored targets match the formulas.")
+        return
+    print(f"⚠️ {problems['username'].nunique()} user(s) with stale or inconsistent targets:")
+    print(problems.head(30).to_string(index=False))
+    fix = input("Recompute targets for these users? (y/n): ").strip().lower()
+    if fix == 'y':
+        with file_lock(USER_DB_FILE):
+            df = _with_target_columns(pd.read_csv(USER_DB_FILE))
+            mask = df['username'].isin(problems['username'])
+            _save_user_db(_store_targets(df, mask, TARGET_FIELDS))
+        print(f"✅ Recomputed targets for {int(mask.sum())} user(s).")
+
 @log_action
 def update_user_weight(username, new_weight):
-    df = ensure_user_db()
-    mask = df['username'].str.lower() == username.lower()
-    if not mask.any():
-        print("⚠️ User not found.")
+    return update_user_profile(username, weight_kg=new_weight)
+
+@log_action
+def update_user_profile(username, **changes):
+    """Update profile fields and recompute only the stored targets that depend on them"""
+    unknown = sorted(set(changes) - set(EDITABLE_PROFILE_FIELDS))
+    if unknown:
+        print(f"⚠️ Unknown profile field(s): {', '.join(unknown)}")
         return False
-    df.loc[mask, 'weight_kg'] = new_weight
-    df.to_csv(USER_DB_FILE, index=False)
+    ensure_user_db()
+    with file_lock(USER_DB_FILE):
+        df = _with_target_columns(pd.read_csv(USER_DB_FILE))
+        mask = df['username'].str.lower() == username.lower()
+        if not mask.any():
+            print("⚠️ User not found.")
+            return False
+        row = df.loc[mask].iloc[0]
+        changed = [f for f, v in changes.items() if str(row[f]) != str(v)]
+        for f in changed:
+            if df[f].dtype != object and isinstance(changes[f], str):
+                df[f] = df[f].astype(object)
+            elif pd.api.types.is_integer_dtype(df[f]) and isinstance(changes[f], float):
+                df[f] = df[f].astype(float)
+            df.loc[mask, f] = changes[f]
+        if _stale_target_rows(df.loc[mask]).any():
+            refreshed = TARGET_FIELDS
+        else:
+            refreshed = affected_targets(changed)
+        if refreshed:
+            _save_user_db(_store_targets(df, mask, refreshed))
+        elif changed:
+            _save_user_db(df)    # e.g. a name edit: targets unchanged, so no version bump
+    if refreshed:
+        print(f"✅ Profile updated (recomputed: {', '.join(refreshed)}).")
+    else:
+        print("✅ Profile updated." if changed else "No changes.")
     return True
 
 @log_action
@@ -352,9 +631,9 @@ def save_daily_entry(username, foods: List[Tuple[str,int]], total_calories: int,
         "total_calories": total_calories,
         "weight": weight if weight is not None else ""
     }
-    logs_df = pd.read_csv(LOGS_FILE)
-    logs_df = pd.concat([logs_df, pd.DataFrame([row])], ignore_index=True)
-    logs_df.to_csv(LOGS_FILE, index=False)
+    line = pd.DataFrame([row]).to_csv(index=False, header=False).encode("utf-8")
+    with file_lock(LOGS_FILE), open(LOGS_FILE, "ab") as f:
+        f.write(line)    # one append, so concurrent sessions never rewrite each other's rows
     print("✅ Daily entry saved.")
 
 @log_action
@@ -373,37 +652,367 @@ def export_user_logs(username, fmt="csv"):
         user_logs.to_json(path, orient="records", date_format="iso")
     print(f"✅ Exported to {path}")
 
+# -------------------------
+# Food catalog versioning & change feed
+# -------------------------
+# Every write to FOOD_DB_FILE bumps a monotonically increasing catalog version and appends
+# (version, op, food, old_calories, new_calories) to FOOD_CHANGES_FILE. op is one of
+# add / update / delete / reset (reset = whole catalog replaced, consumers must reload).
+# Once the log passes FOOD_CHANGELOG_MAX_ENTRIES it is truncated to the newest
+# FOOD_CHANGELOG_KEEP_ENTRIES; consumers older than that get None and reload instead.
+# The CSV rewrite, version bump and log append all happen under file_lock(FOOD_DB_FILE),
+# so versions are never duplicated or lost across processes.
+def _load_food_catalog_meta():
+    if os.path.exists(FOOD_CATALOG_META_FILE):
+        try:
+            with open(FOOD_CATALOG_META_FILE, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"version": 0, "compacted_through": 0, "log_entries": 0}
+
+def _save_food_catalog_meta(meta):
+    atomic_write_bytes(FOOD_CATALOG_META_FILE, json.dumps(meta).encode("utf-8"))
+
+def _commit_food_db_locked(df: pd.DataFrame, changes):
+    """Write the catalog CSV, log its changes and recompile the binary catalog (lock held)"""
+    atomic_write_bytes(FOOD_DB_FILE, df.to_csv(index=False).encode("utf-8"))
+    _record_food_changes_locked(changes)
+    try:
+        _compile_food_catalog_locked(df)
+    except OSError as e:
+        # the edit itself is saved; the stale binary is recompiled on its next open
+        print(f"⚠️ Food catalog not recompiled ({e}); it will be rebuilt on next use.")
+
+def food_catalog_version() -> int:
+    return int(_load_food_catalog_meta()["version"])
+
+def record_food_changes(changes):
+    """Append (op, food, old_calories, new_calories) tuples to the change log; returns new version"""
+    with file_lock(FOOD_DB_FILE):
+        return _record_food_changes_locked(changes)
+
+def _record_food_changes_locked(changes):
+    meta = _load_food_catalog_meta()
+    if not changes:
+        return meta["version"]
+    stamp = datetime.now().isoformat(timespec="seconds")
+    rows = []
+    for op, food, old_cal, new_cal in changes:
+        meta["version"] += 1
+        rows.append({"version": meta["version"], "op": op, "food": food,
+                     "old_calories": old_cal, "new_calories": new_cal, "timestamp": stamp})
+    write_header = not os.path.exists(FOOD_CHANGES_FILE)
+    pd.DataFrame(rows).to_csv(FOOD_CHANGES_FILE, mode="a", header=write_header, index=False)
+    meta["log_entries"] += len(rows)
+    if meta["log_entries"] > FOOD_CHANGELOG_MAX_ENTRIES:
+        _compact_food_changes_locked(meta)
+    _save_food_catalog_meta(meta)
+    return meta["version"]
+
+def compact_food_changes(keep=None):
+    """Drop all but the newest `keep` change-log entries"""
+    with file_lock(FOOD_DB_FILE):
+        meta = _compact_food_changes_locked(_load_food_catalog_meta(), keep)
+        _save_food_catalog_meta(meta)
+    return meta
+
+def _compact_food_changes_locked(meta, keep=None):
+    keep = FOOD_CHANGELOG_KEEP_ENTRIES if keep is None else keep
+    if not os.path.exists(FOOD_CHANGES_FILE):
+        return meta
+    log = pd.read_csv(FOOD_CHANGES_FILE)
+    if len(log) > keep:
+        dropped = log.iloc[:len(log) - keep]
+        log = log.iloc[len(log) - keep:]
+        meta["compacted_through"] = int(dropped['version'].max())
+        atomic_write_bytes(FOOD_CHANGES_FILE, log.to_csv(index=False).encode("utf-8"))
+    meta["log_entries"] = len(log)
+    return meta
+
+def food_changes_since(version: int):
+    """
+    Changes with version > `version`, oldest first, as dicts. Returns None when the
+    requested range was compacted away (the caller should reload the full catalog).
+    """
+    if version >= _load_food_catalog_meta()["version"]:
+        return []                      # up to date: no need to wait for the lock
+    # meta and log are read under one lock, so a compaction cannot slip in between and
+    # leave a silently partial list
+    with file_lock(FOOD_DB_FILE):
+        meta = _load_food_catalog_meta()
+        if version < meta["compacted_through"]:
+            return None
+        if version >= meta["version"] or not os.path.exists(FOOD_CHANGES_FILE):
+            return []
+        log = pd.read_csv(FOOD_CHANGES_FILE, keep_default_na=False)
+    log = log[log['version'] > version]
+    changes = []
+    for rec in log.to_dict("records"):
+        for key in ("old_calories", "new_calories"):
+            rec[key] = int(float(rec[key])) if rec[key] != "" else None
+        changes.append(rec)
+    return changes
+
+def apply_food_changes(df: pd.DataFrame, changes) -> pd.DataFrame:
+    """Apply change-feed deltas to a copy of a Food/Calories frame (no reset handling)"""
+    df = df.copy()
+    for ch in changes:
+        key = str(ch['food']).lower()
+        if ch['op'] == "add":
+            df = pd.concat([df, pd.DataFrame([{"Food": ch['food'], "Calories": ch['new_calories']}])],
+                           ignore_index=True)
+        elif ch['op'] == "update":
+            df.loc[df['Food'].str.lower() == key, 'Calories'] = ch['new_calories']
+        elif ch['op'] == "delete":
+            df = df[df['Food'].str.lower() != key].reset_index(drop=True)
+    return df
+
+def refresh_food_view(df: pd.DataFrame, version: int):
+    """
+    Bring a cached catalog frame up to date. Returns (df, version); applies deltas when
+    possible and only re-reads FOOD_DB_FILE after a reset or a compacted-away range.
+    """
+    changes = food_changes_since(version)
+    if changes == []:
+        return df, version
+    if changes is None or any(ch['op'] == "reset" for ch in changes):
+        return ensure_food_db(), food_catalog_version()
+    return apply_food_changes(df, changes), int(changes[-1]['version'])
+
+# -------------------------
+# Compiled binary food catalog (mmap, shared between processes)
+# -------------------------
+# Layout (little-endian, sections 8-byte aligned):
+#   header      magic, format, catalog version, CSV mtime_ns + size, count, name blob size
+#   calories    int32[count]
+#   offsets     uint64[count + 1]   start of each name in the blob (last = blob size)
+#   name_order  uint32[count]       ids sorted by lowercase name (stable), for binary search
+#   names       utf-8 blob          original spelling
+# The CSV stays the source of truth. Every catalog write recompiles the binary under the
+# same lock, so readers (read_food_db, meal planner lookups, admin view) just map it via
+# food_catalog(); a stale file (CSV edited by hand) is recompiled on open. Readers only
+# touch the pages they need, and the page cache is shared by every process.
+_CATALOG_MAGIC = b"NSCATLG\0"
+_CATALOG_FORMAT = 1
+_CATALOG_HEADER = struct.Struct("<8sIIQqQQQ")
+
+def _align8(n):
+    return (n + 7) & ~7
+
+def compile_food_catalog():
+    """Compile FOOD_DB_FILE into the binary catalog format; returns the food count"""
+    ensure_food_db_file()
+    with file_lock(FOOD_DB_FILE):
+        return _compile_food_catalog_locked()
+
+def _compile_food_catalog_locked(df: pd.DataFrame = None):
+    """
+    Write FOOD_CATALOG_BIN_FILE from `df` (already in memory when called by a writer)
+    or from the CSV. Caller holds file_lock(FOOD_DB_FILE).
+    """
+    data = _food_catalog_bytes(df)
+    # Windows cannot replace a file this process still has mapped
+    release_food_catalog()
+    atomic_write_bytes(FOOD_CATALOG_BIN_FILE, data)
+    return _CATALOG_HEADER.unpack_from(data, 0)[6]
+
+def _food_catalog_bytes(df: pd.DataFrame = None) -> bytes:
+    """The compiled catalog image for `df` (default: the CSV), stamped with the CSV's stat"""
+    st = os.stat(FOOD_DB_FILE)
+    if df is None:
+        df = pd.read_csv(FOOD_DB_FILE, dtype={"Food": str}, keep_default_na=False)
+    names = df['Food'].astype(str).tolist()
+    encoded = [n.encode("utf-8") for n in names]
+    count = len(encoded)
+    calories = pd.to_numeric(df['Calories'], errors='coerce').fillna(0).to_numpy(dtype="<i4")
+    lengths = np.fromiter((len(b) for b in encoded), dtype="<u8", count=count)
+    offsets = np.zeros(count + 1, dtype="<u8")
+    np.cumsum(lengths, out=offsets[1:])
+    keys = [n.lower() for n in names]
+    order = np.array(sorted(range(count), key=keys.__getitem__), dtype="<u4")
+    blob = b"".join(encoded)
+    header = _CATALOG_HEADER.pack(_CATALOG_MAGIC, _CATALOG_FORMAT, 0, food_catalog_version(),
+                                  st.st_mtime_ns, st.st_size, count, len(blob))
+    parts = []
+    for section in (header, calories.tobytes(), offsets.tobytes(), order.tobytes()):
+        parts.append(section)
+        parts.append(b"\0" * (_align8(len(section)) - len(section)))
+    parts.append(blob)
+    return b"".join(parts)
+
+class BinaryFoodCatalog:
+    """Read-only, mmap-backed view of a compiled food catalog (or of an in-memory image)"""
+
+    def __init__(self, path=None, data: bytes = None):
+        self.path = path or FOOD_CATALOG_BIN_FILE
+        if data is not None:
+            self._mm = data
+        else:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, fmt, _, self.version, self.csv_mtime_ns, self.csv_size,
+         count, blob_size) = _CATALOG_HEADER.unpack_from(self._mm, 0)
+        if magic != _CATALOG_MAGIC or fmt != _CATALOG_FORMAT:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not a NutriScale food catalog")
+        self.count = count
+        pos = _align8(_CATALOG_HEADER.size)
+        self.calories = np.frombuffer(self._mm, dtype="<i4", count=count, offset=pos)
+        pos += _align8(4 * count)
+        self._offsets = np.frombuffer(self._mm, dtype="<u8", count=count + 1, offset=pos)
+        pos += _align8(8 * (count + 1))
+        self._order = np.frombuffer(self._mm, dtype="<u4", count=count, offset=pos)
+        pos += _align8(4 * count)
+        self._names_start = pos
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # drop the numpy views first; mmap refuses to close while buffers are exported
+        self.calories = self._offsets = self._order = None
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def name(self, food_id: int) -> str:
+        start = self._names_start + int(self._offsets[food_id])
+        end = self._names_start + int(self._offsets[food_id + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def get(self, food_id: int) -> Tuple[str, int]:
+        """(name, calories) by id (row number in the CSV)"""
+        return self.name(food_id), int(self.calories[food_id])
+
+    def find(self, food_name: str):
+        """Case-insensitive exact match -> id of the first such row in the CSV, or None"""
+        key = food_name.lower()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.name(int(self._order[mid])).lower() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.name(int(self._order[lo])).lower() == key:
+            return int(self._order[lo])
+        return None
+
+    def lookup(self, food_name: str):
+        """(name, calories) for a case-insensitive name, or None"""
+        food_id = self.find(food_name)
+        return None if food_id is None else self.get(food_id)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialise as the usual Food/Calories DataFrame (no CSV parsing)"""
+        blob = self._mm[self._names_start:self._names_start + int(self._offsets[-1])]
+        bounds = self._offsets.tolist()
+        names = [blob[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(self.count)]
+        return pd.DataFrame({"Food": names, "Calories": self.calories.astype(int)})
+
+    def is_current(self) -> bool:
+        """True while this mapping still reflects FOOD_DB_FILE and the catalog version"""
+        try:
+            st = os.stat(FOOD_DB_FILE)
+        except OSError:
+            return False
+        return (self.version == food_catalog_version() and self.csv_mtime_ns == st.st_mtime_ns
+                and self.csv_size == st.st_size)
+
+def _food_catalog_is_fresh(path):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_CATALOG_HEADER.size)
+        magic, fmt, _, version, mtime_ns, size, _, _ = _CATALOG_HEADER.unpack(head)
+    except (OSError, struct.error):
+        return False
+    st = os.stat(FOOD_DB_FILE)
+    return (magic == _CATALOG_MAGIC and fmt == _CATALOG_FORMAT and version == food_catalog_version()
+            and mtime_ns == st.st_mtime_ns and size == st.st_size)
+
+def open_food_catalog() -> BinaryFoodCatalog:
+    """
+    Open the mmap catalog. Writers recompile it under the catalog lock, so this normally
+    just maps the file; it only compiles when the CSV was changed outside NutriScale
+    (or a writer's recompile failed). If the stale file cannot be replaced (on Windows,
+    while another process has it mapped) this process serves an in-memory image instead.
+    """
+    ensure_food_db_file()
+    if not _food_catalog_is_fresh(FOOD_CATALOG_BIN_FILE):
+        with file_lock(FOOD_DB_FILE):
+            if not _food_catalog_is_fresh(FOOD_CATALOG_BIN_FILE):
+                try:
+                    _compile_food_catalog_locked()
+                except OSError:
+                    return BinaryFoodCatalog(FOOD_CATALOG_BIN_FILE, data=_food_catalog_bytes())
+    return BinaryFoodCatalog(FOOD_CATALOG_BIN_FILE)
+
+_catalog_cache = {"path": None, "catalog": None}
+
+def food_catalog() -> BinaryFoodCatalog:
+    """The process-wide open catalog, remapped only after the food database changes"""
+    cat = _catalog_cache["catalog"]
+    path = os.path.abspath(FOOD_CATALOG_BIN_FILE)
+    if cat is None or _catalog_cache["path"] != path or not cat.is_current():
+        # the old mapping is released once nothing references it any more
+        _catalog_cache["catalog"] = open_food_catalog()
+        _catalog_cache["path"] = path
+    return _catalog_cache["catalog"]
+
+def release_food_catalog():
+    """Unmap the process-wide catalog (it is reopened on the next food_catalog() call)"""
+    cat = _catalog_cache["catalog"]
+    _catalog_cache["catalog"] = _catalog_cache["path"] = None
+    if cat is not None:
+        cat.close()
+
 # -------------------------
 # CRUD Food DB ops
 # -------------------------
 @log_action
 def read_food_db():
-    return ensure_food_db()
+    return food_catalog().to_frame()
 
 @log_action
 def add_food_to_db(food_name, calories):
-    df = ensure_food_db()
-    df = pd.concat([df, pd.DataFrame([{"Food": food_name, "Calories": int(calories)}])], ignore_index=True)
-    df.to_csv(FOOD_DB_FILE, index=False)
+    ensure_food_db()
+    with file_lock(FOOD_DB_FILE):
+        df = pd.read_csv(FOOD_DB_FILE)
+        df = pd.concat([df, pd.DataFrame([{"Food": food_name, "Calories": int(calories)}])], ignore_index=True)
+        _commit_food_db_locked(df, [("add", food_name, None, int(calories))])
     print(f"✅ Added {food_name} ({calories} kcal).")
 
 @log_action
 def update_food_db(food_name, calories):
-    df = ensure_food_db()
-    mask = df['Food'].str.lower() == food_name.lower()
-    if not mask.any():
-        print("⚠️ Food not found.")
-        return False
-    df.loc[mask, 'Calories'] = int(calories)
-    df.to_csv(FOOD_DB_FILE, index=False)
+    ensure_food_db()
+    with file_lock(FOOD_DB_FILE):
+        df = pd.read_csv(FOOD_DB_FILE)
+        mask = df['Food'].str.lower() == food_name.lower()
+        if not mask.any():
+            print("⚠️ Food not found.")
+            return False
+        old_cal = int(df.loc[mask, 'Calories'].iloc[0])
+        df.loc[mask, 'Calories'] = int(calories)
+        _commit_food_db_locked(df, [("update", food_name, old_cal, int(calories))])
     print("✅ Updated food.")
     return True
 
 @log_action
 def delete_food_from_db(food_name):
-    df = ensure_food_db()
-    df = df[df['Food'].str.lower() != food_name.lower()]
-    df.to_csv(FOOD_DB_FILE, index=False)
+    ensure_food_db()
+    with file_lock(FOOD_DB_FILE):
+        df = pd.read_csv(FOOD_DB_FILE)
+        mask = df['Food'].str.lower() == food_name.lower()
+        if mask.any():
+            old_cal = int(df.loc[mask, 'Calories'].iloc[0])
+            df = df[~mask]
+            _commit_food_db_locked(df, [("delete", food_name, old_cal, None)])
     print("✅ Deleted if it existed.")
 
 # -------------------------
@@ -451,7 +1060,10 @@ def recommend_foods_for_calories(cal_goal: int, food_df: pd.DataFrame, items=5):
     combo = find_combination_close(meals, cal_goal, tolerance=int(0.08*cal_goal))
     if combo:
         return combo
-    # fallback: greedy pick items until near target
+    return _greedy_combination(meals, cal_goal, items)
+
+def _greedy_combination(meals: List[Tuple[str,int]], cal_goal: int, items=5):
+    """Fallback: greedy pick items (largest first) until near target"""
     sorted_desc = sorted(meals, key=lambda x: x[1], reverse=True)
     total = 0
     chosen = []
@@ -463,6 +1075,185 @@ def recommend_foods_for_calories(cal_goal: int, food_df: pd.DataFrame, items=5):
             break
     return chosen if chosen else sorted_desc[:min(items, len(sorted_desc))]
 
+def _combination_rank(combo, cal_goal):
+    """Sort key: deviation from goal, then fewer items, then balance (smallest max share)"""
+    total = sum(c for _, c in combo)
+    share = max(c for _, c in combo) / total if total > 0 else 1.0
+    return (abs(total - cal_goal), len(combo), round(share, 4), tuple(n.lower() for n, _ in combo))
+
+def _too_similar(names, other) -> bool:
+    """True if two plans (sets of lowercase names) share too many foods to be alternatives"""
+    return len(names & other) > SUGGESTION_MAX_SHARED * min(len(names), len(other))
+
+def _suggestion_meals(food_df: pd.DataFrame) -> List[Tuple[str,int]]:
+    """Distinct foods (first spelling wins, no negative calories), largest first"""
+    seen = set()
+    meals = []
+    for name, cal in zip(food_df['Food'], food_df['Calories']):
+        if str(name).lower() not in seen and int(cal) >= 0:
+            seen.add(str(name).lower())
+            meals.append((str(name), int(cal)))
+    meals.sort(key=lambda x: x[1], reverse=True)        # big items first -> short combos early
+    return meals
+
+def _fewest_items_combination(meals: List[Tuple[str,int]], cal_goal: int):
+    """
+    Plan closest to cal_goal using the fewest items (0/1 knapsack over calorie sums).
+    Exact for the first two _combination_rank keys; seeds recommend_foods_top_k.
+    """
+    cals = np.array([c for _, c in meals], dtype=np.int64)
+    top = cal_goal + min(cal_goal, int(cals.max(initial=0)))   # larger sums are farther off
+    if top <= 0:
+        return []
+    unreachable = len(meals) + 1
+    count = np.full(top + 1, unreachable, dtype=np.int64)      # fewest items per exact sum
+    count[0] = 0
+    took = np.zeros((len(meals), top + 1), dtype=bool)
+    for i, c in enumerate(cals):
+        if 0 < c <= top:
+            with_item = count[:top + 1 - c] + 1
+            np.less(with_item, count[c:], out=took[i, c:])
+            np.minimum(count[c:], with_item, out=count[c:])
+    sums = np.flatnonzero(count[1:] < unreachable) + 1
+    if len(sums) == 0:
+        return []
+    s = int(sums[np.lexsort((count[sums], np.abs(sums - cal_goal)))[0]])
+    combo = []
+    for i in range(len(meals) - 1, -1, -1):
+        if s > 0 and took[i, s]:
+            combo.append(meals[i])
+            s -= int(cals[i])
+    return combo[::-1]                                          # keep the meals' order
+
+def recommend_foods_top_k(cal_goal: int, food_df: pd.DataFrame, k=3, budget_ms=20):
+    """
+    Anytime branch & bound for k varied food combinations, one search per slot: each is
+    the best combination by _combination_rank that is not _too_similar to the ones
+    already chosen (so they are real alternatives, not one plan with a swapped filler).
+    Every slot starts from the fewest-items plan over foods no earlier plan uses.
+    Returns (combos, proven_optimal): combos are lists of (name, calories), best first.
+    When the wall-clock budget runs out (setup included) the best found so far is
+    returned and proven_optimal is False. Fewer than k combos are returned when no
+    sufficiently different combination exists. Catalogs with more than
+    SUGGESTION_MAX_CANDIDATES rows are searched on an evenly spaced sample of rows (so
+    setup stays within the budget), and those results are never reported as proven.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    thinned = len(food_df) > SUGGESTION_MAX_CANDIDATES
+    if thinned:
+        food_df = food_df.iloc[np.linspace(0, len(food_df) - 1, SUGGESTION_MAX_CANDIDATES).astype(int)]
+    meals = _suggestion_meals(food_df)
+    cals = [c for _, c in meals]
+    n = len(meals)
+    prefix = [0]
+    for c in cals:
+        prefix.append(prefix[-1] + c)
+    neg_cals = [-c for c in cals]                       # ascending, for bisect
+
+    chosen_sets = []                                    # name sets of the combos kept so far
+    best = []                                           # [(rank, combo)] of the current slot
+
+    def offer(combo):
+        if not combo:
+            return
+        rank = _combination_rank(combo, cal_goal)
+        if best and rank >= best[0][0]:
+            return
+        names = set(rank[3])
+        if any(_too_similar(names, other) for other in chosen_sets):
+            return
+        best[:] = [(rank, list(combo))]
+
+    if n == 0 or k <= 0:
+        return [], True
+    nodes = 0
+    slot_deadline = deadline
+    timed_out = False                                   # some slot hit its deadline
+
+    def search(i, total, chosen):
+        nonlocal nodes, timed_out
+        nodes += 1
+        if nodes % 64 == 0 and time.perf_counter() > slot_deadline:
+            timed_out = True
+            raise TimeoutError
+        if chosen:
+            offer(chosen)
+        if i >= n:
+            return
+        full = bool(best)
+        worst_dev = best[0][0][0] if full else float('inf')
+        # even taking every remaining food cannot get within worst_dev of the goal
+        if total + prefix[n] - prefix[i] < cal_goal - worst_dev:
+            return
+        if full and worst_dev == 0:
+            # only exact hits can still qualify, and they must not need more items than the
+            # best: the largest items left must be able to close the gap within that count
+            room = best[0][0][1] - len(chosen)
+            if room <= 0 or prefix[min(n, i + room)] - prefix[i] < cal_goal - total:
+                return
+        # foods are in descending order: skip those that overshoot by more than worst_dev
+        start = bisect.bisect_left(neg_cals, -(cal_goal + worst_dev - total), lo=i) if full else i
+        for j in range(start, n):
+            if full and total + cals[j] - cal_goal > worst_dev:
+                continue
+            chosen.append(meals[j])
+            search(j + 1, total + cals[j], chosen)
+            chosen.pop()
+
+    combos = []
+    while len(combos) < k:
+        best.clear()
+        # foods no kept plan uses always give a different-enough plan, so the search starts
+        # from a strong bound instead of wading through near-copies of earlier plans
+        offer(_fewest_items_combination(
+            [m for m in meals if not any(m[0].lower() in other for other in chosen_sets)], cal_goal))
+        now = time.perf_counter()
+        if now < deadline:
+            # split what is left of the budget evenly over the remaining slots
+            slot_deadline = now + (deadline - now) / (k - len(combos))
+            try:
+                search(0, 0, [])
+            except TimeoutError:
+                pass
+        else:
+            timed_out = True                            # setup/earlier slots used it all
+        if not best:
+            break                                       # nothing different enough is left
+        combos.append(best[0][1])
+        chosen_sets.append(set(best[0][0][3]))
+    return combos, not (timed_out or thinned)
+
+def _top_k_brute_force(cal_goal: int, food_df: pd.DataFrame, k=3):
+    """Reference for recommend_foods_top_k: rank every subset, keep varied ones (small catalogs only)"""
+    meals = _suggestion_meals(food_df)
+    combos = [list(c) for r in range(1, len(meals) + 1) for c in itertools.combinations(meals, r)]
+    chosen, chosen_sets = [], []
+    for combo in sorted(combos, key=lambda c: _combination_rank(c, cal_goal)):
+        names = {n.lower() for n, _ in combo}
+        if len(chosen) < k and not any(_too_similar(names, other) for other in chosen_sets):
+            chosen.append(combo)
+            chosen_sets.append(names)
+    return chosen
+
+def check_top_k_against_brute_force(trials=300, max_foods=10, seed=0):
+    """Compare recommend_foods_top_k with exhaustive search on random small catalogs; returns mismatches"""
+    rng = np.random.default_rng(seed)
+    pool = ["Apple", "apple", "Rice", "Egg", "Oats", "Milk", "Tofu", "Fish", "Bread", "Nuts", "Salad", "Beans"]
+    mismatches = 0
+    for t in range(trials):
+        n = int(rng.integers(1, max_foods + 1))
+        food_df = pd.DataFrame({"Food": rng.choice(pool, n),
+                                "Calories": rng.integers(-20, 800, n)})
+        cal_goal, k = int(rng.integers(50, 2000)), int(rng.integers(1, 5))
+        got, proven = recommend_foods_top_k(cal_goal, food_df, k=k, budget_ms=10_000)
+        want = _top_k_brute_force(cal_goal, food_df, k=k)
+        if not proven or [_combination_rank(c, cal_goal) for c in got] != \
+                [_combination_rank(c, cal_goal) for c in want]:
+            mismatches += 1
+            print(f"⚠️ trial {t}: goal={cal_goal} k={k} foods={list(zip(food_df['Food'], food_df['Calories']))}")
+            print(f"   got  {got}\n   want {want}")
+    return mismatches
+
 # -------------------------
 # CLI Menus
 # -------------------------
@@ -491,7 +1282,9 @@ def admin_portal():
         print("5. Initialize Default Food DB")
         print("6. View Registered Users")
         print("7. Create Custom Recommendation for User")
-        print("8. Back")
+        print("8. Adherence Report")
+        print("9. Verify Stored User Targets")
+        print("10. Back")
 
 
         choice = input("Choice: ").strip()
@@ -523,6 +1316,12 @@ def admin_portal():
             create_custom_recommendation()
             pause()
         elif choice == "8":
+            adherence_report()
+            pause()
+        elif choice == "9":
+            verify_user_targets_flow()
+            pause()
+        elif choice == "10":
             break
 
 
@@ -555,6 +1354,28 @@ def login_flow():
     print(f"Welcome back, {user['name']}!")
     return user
 
+def edit_profile_flow():
+    clear_console()
+    print("=== EDIT PROFILE ===")
+    username = read_nonempty("Username: ")
+    user = find_user(username)
+    if not user:
+        print("User not found. Please register.")
+        pause()
+        return
+    print("Leave blank to keep the current value.")
+    changes = {}
+    for field, label, cast in (("weight_kg", "Weight (kg)", float),
+                               ("target_weight", "Target weight (kg)", float),
+                               ("activity", "Activity level", str.lower),
+                               ("height_cm", "Height (cm)", float),
+                               ("age", "Age", int)):
+        v = input(f"{label} [{user[field]}]: ").strip()
+        if v:
+            changes[field] = cast(v)
+    update_user_profile(user['username'], **changes)
+    pause()
+
 def client_portal():
     user = login_flow()
     if not user:
@@ -566,19 +1387,14 @@ def client_portal():
     if not user_logs.empty:
         last = user_logs.iloc[-1]
         print(f"Last log: {last['date']} — {last['total_calories']} kcal — foods: {last['foods']}")
-    # calculate metrics
+    # stored targets (recomputed only when the profile changes)
     weight = float(user['weight_kg'])
-    height = float(user['height_cm'])
-    age = int(user['age'])
-    gender = user['gender']
-    target_weight = float(user['target_weight'])
-    activity = user.get('activity','sedentary')
-    bmi = calculate_bmi(weight, height)
+    targets = get_user_targets(user)
+    bmi = float(targets['bmi'])
     cat, rectext = bmi_category_and_recommendation(bmi)
-    bmr = mifflin_st_jeor(weight, height, age, gender)
-    tdee = tdee_from_activity(bmr, activity)
-    rec_cal = recommended_calories(tdee, weight, target_weight)
-    macros = macronutrient_breakdown(rec_cal)
+    tdee = float(targets['tdee'])
+    rec_cal = int(targets['recommended_calories'])
+    macros = {k: int(targets[k]) for k in ("protein_g", "fat_g", "carbs_g")}
     # Show user-friendly messages
     print(f"\nBMI: {bmi} — {cat}")
     print(rectext)
@@ -604,11 +1420,8 @@ def client_portal():
     print("\n" + random.choice(quotes))
 
     # Show admin custom recommendation if available
-    ensure_recommendations()
-    df_rec = pd.read_csv(RECOMMENDATIONS_FILE)
-    user_recs = df_rec[df_rec['username'].str.lower() == username.lower()]
-    if not user_recs.empty:
-        latest = user_recs.iloc[-1]
+    latest = latest_recommendation(username)
+    if latest:
         print("\n📅 Admin Custom Weekly Plan:")
         print(latest['recommendations'])
         print(f"(Created on {latest['date_created']})")
@@ -616,19 +1429,33 @@ def client_portal():
     # Meal recommendation
     df_food = read_food_db()
     print("\nSmart meal suggestions to match recommended calories:")
-    suggestion = recommend_foods_for_calories(rec_cal, df_food)
+    alternatives, proven = recommend_foods_top_k(rec_cal, df_food, k=SUGGESTION_COUNT,
+                                                 budget_ms=SUGGESTION_BUDGET_MS)
+    # extra options only help if they are on target (a small catalog may not have enough
+    # different foods for a large goal)
+    alternatives = alternatives[:1] + [combo for combo in alternatives[1:]
+                                       if abs(sum(c for _, c in combo) - rec_cal) <= ADHERENCE_BAND * rec_cal]
+    for i, combo in enumerate(alternatives, 1):
+        combo_total = sum(c for _, c in combo)
+        print(f"\nOption {i}: {combo_total} kcal ({combo_total - rec_cal:+d} vs goal, {len(combo)} items)")
+        for name, c in combo:
+            print(f" - {name} ({c} kcal)")
+    if not proven:
+        print("(best found within the time limit)")
+    suggestion = alternatives[0] if alternatives else []
     total_sug = sum([c for _,c in suggestion]) if suggestion else 0
-    for name, c in suggestion:
-        print(f" - {name} ({c} kcal)")
-    print(f"Suggested total (approx): {total_sug} kcal")
     # allow user to customize today's intake
     customize = input("\nWould you like to customize today's intake? (y/n): ").strip().lower()
     if customize == 'y':
         custom_meal_flow(username, df_food, rec_cal, weight)
     else:
         # save suggested as today's entry if user accepts
-        accept = input("Save suggested plan as today's entry? (y/n): ").strip().lower()
-        if accept == 'y':
+        accept = input(f"Save a suggested plan as today's entry? (1-{max(len(alternatives), 1)}/y/n): ").strip().lower()
+        if accept.isdigit() and 1 <= int(accept) <= len(alternatives):
+            suggestion = alternatives[int(accept) - 1]
+            total_sug = sum(c for _, c in suggestion)
+            accept = 'y'
+        if accept == 'y' and suggestion:
             save_daily_entry(username, suggestion, total_sug, weight)
             # update user weight? offer option
             update = input("Update recorded weight for your profile? (y/n): ").strip().lower()
@@ -643,7 +1470,10 @@ def custom_meal_flow(username, df_food: pd.DataFrame, calorie_goal: int, curr_we
     # Show options: search, list top N, add custom food, finish
     selected = []
     total = 0
+    catalog_version = food_catalog_version()
     while True:
+        # pick up foods added/edited since the planner opened (incl. 'addcustom') as deltas
+        df_food, catalog_version = refresh_food_view(df_food, catalog_version)
         clear_console()
         print("=== CUSTOM MEAL PLANNER ===")
         print(f"Goal (recommended): {calorie_goal} kcal | Current total: {total} kcal")
@@ -693,17 +1523,17 @@ def custom_meal_flow(username, df_food: pd.DataFrame, calorie_goal: int, curr_we
         else:
             # interpret input as attempt to add a food by exact name
             name_try = cmd
-            matches_mask = df_food['Food'].str.lower() == name_try.lower()
-            if matches_mask.any():
-                row = df_food.loc[matches_mask].iloc[0]
-                selected.append((row['Food'], int(row['Calories'])))
-                total += int(row['Calories'])
-                print(f"Selected {row['Food']} ({row['Calories']} kcal). Total now {total} kcal.")
+            found = food_catalog().lookup(name_try)
+            if found:
+                food, cal = found
+                selected.append((food, cal))
+                total += cal
+                print(f"Selected {food} ({cal} kcal). Total now {total} kcal.")
                 # immediate feedback
-                if total > calorie_goal * 1.1:
-                    print("⚠️ Total exceeds recommended by >10%")
-                elif total < calorie_goal * 0.9:
-                    print("⚠️ Total below recommended by >10%")
+                if total > calorie_goal * (1 + ADHERENCE_BAND):
+                    print(f"⚠️ Total exceeds recommended by >{ADHERENCE_BAND:.0%}")
+                elif total < calorie_goal * (1 - ADHERENCE_BAND):
+                    print(f"⚠️ Total below recommended by >{ADHERENCE_BAND:.0%}")
                 else:
                     print("✅ Total within recommended range.")
             else:
@@ -719,62 +1549,724 @@ def custom_meal_flow(username, df_food: pd.DataFrame, calorie_goal: int, curr_we
     else:
         print("No foods selected. Nothing saved.")
 
+# -------------------------
+# Recommendations store: bulk append + per-user index
+# -------------------------
+# A small sqlite index maps each lowercase username to the (byte offset, length) of its
+# rows in RECOMMENDATIONS_FILE, so a user's latest plan is one indexed query + one seek
+# instead of a scan of the whole CSV, and nothing has to be loaded up front. The meta
+# table records how many bytes of the CSV are indexed, plus the file's mtime/inode and a
+# checksum of the last indexed bytes so a rewrite (even to the same or a larger size) is
+# detected and triggers a rebuild. Rows are whole CSV records, so quoted plans may span
+# several lines. Writers hold file_lock on the CSV.
+def _open_recommendation_index():
+    conn = sqlite3.connect(RECOMMENDATIONS_INDEX_FILE, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS rows (username TEXT, offset INTEGER, length INTEGER)")
+    conn.execute("CREATE INDEX IF NOT EXISTS rows_by_user ON rows (username, offset)")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+    return conn
+
+def _index_meta(conn):
+    return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+def _recommendations_stamp():
+    st = os.stat(RECOMMENDATIONS_FILE)
+    return st.st_size, st.st_mtime_ns, st.st_ino % (1 << 63)    # sqlite integers are signed 64-bit
+
+def _tail_checksum(f, end):
+    f.seek(max(0, end - 64))
+    return zlib.crc32(f.read(end - max(0, end - 64)))
+
+def _index_is_current(conn):
+    meta = _index_meta(conn)
+    return (meta.get('size', 0), meta.get('mtime'), meta.get('inode')) == _recommendations_stamp()
+
+def _mark_indexed(conn, end):
+    """Record that the CSV is indexed up to byte `end`, stamped with its current mtime/inode"""
+    size, mtime, inode = _recommendations_stamp()
+    with open(RECOMMENDATIONS_FILE, "rb") as f:
+        tail = _tail_checksum(f, end)
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                     [("size", end), ("mtime", mtime), ("inode", inode), ("tail", tail)])
+    conn.commit()
+
+def _parse_recommendation_record(data: bytes):
+    """One CSV record (possibly spanning lines) -> list of fields"""
+    return next(csv.reader(io.StringIO(data.decode("utf-8"), newline="")), [])
+
+def _encode_recommendation_rows(rows):
+    """Encode (username, date_created, plan) rows as CSV lines (same quoting as pandas)"""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    lines = []
+    for row in rows:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(row)
+        lines.append(buf.getvalue().encode("utf-8"))
+    return lines
+
+def _catch_up_recommendation_index(conn):
+    """
+    Index rows appended by other code paths; rebuild if the CSV was rewritten (shrank,
+    was replaced, or its indexed bytes changed). Caller holds file_lock(RECOMMENDATIONS_FILE).
+    """
+    if _index_is_current(conn):
+        return
+    meta = _index_meta(conn)
+    size, _, inode = _recommendations_stamp()
+    start = meta.get('size', 0)
+    entries = []
+    with open(RECOMMENDATIONS_FILE, "rb") as f:
+        if start > size or meta.get('inode') != inode or _tail_checksum(f, start) != meta.get('tail', 0):
+            conn.execute("DELETE FROM rows")
+            start = 0
+        f.seek(start)
+        offset = start
+        record = b""
+        for line in f:
+            record += line
+            if record.count(b'"') % 2:
+                continue                # newline inside a quoted field: record continues
+            if offset > 0 and record.strip():
+                row = _parse_recommendation_record(record)
+                if row:
+                    entries.append((row[0].lower(), offset, len(record)))
+            offset += len(record)
+            record = b""
+    conn.executemany("INSERT INTO rows VALUES (?, ?, ?)", entries)
+    _mark_indexed(conn, offset)
+
+def _user_recommendation_entries(username, latest_only=False):
+    ensure_recommendations_file()
+    with closing(_open_recommendation_index()) as conn:
+        if not _index_is_current(conn):
+            with file_lock(RECOMMENDATIONS_FILE):
+                _catch_up_recommendation_index(conn)
+        sql = "SELECT offset, length FROM rows WHERE username = ? ORDER BY offset"
+        if latest_only:
+            sql += " DESC LIMIT 1"
+        return conn.execute(sql, (username.lower(),)).fetchall()
+
+def append_recommendations(usernames, plan, date_created=None):
+    """Append one plan for every username in a single write and update the index"""
+    if not usernames:
+        return 0
+    ensure_recommendations_file()
+    date_created = date_created or date.today().isoformat()
+    lines = _encode_recommendation_rows([(u, date_created, plan) for u in usernames])
+    with file_lock(RECOMMENDATIONS_FILE), closing(_open_recommendation_index()) as conn:
+        _catch_up_recommendation_index(conn)
+        with open(RECOMMENDATIONS_FILE, "ab") as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(b"".join(lines))
+        entries = []
+        for u, line in zip(usernames, lines):
+            entries.append((u.lower(), offset, len(line)))
+            offset += len(line)
+        conn.executemany("INSERT INTO rows VALUES (?, ?, ?)", entries)
+        _mark_indexed(conn, offset)
+    return len(lines)
+
+def _read_recommendation_rows(entries):
+    rows = []
+    with open(RECOMMENDATIONS_FILE, "rb") as f:
+        for offset, length in entries:
+            f.seek(offset)
+            row = _parse_recommendation_record(f.read(length))
+            rows.append({"username": row[0], "date_created": row[1],
+                         "recommendations": row[2] if len(row) > 2 else ""})
+    return rows
+
+def latest_recommendation(username):
+    """Most recent custom plan for a user (dict) or None"""
+    entries = _user_recommendation_entries(username, latest_only=True)
+    if not entries:
+        return None
+    return _read_recommendation_rows(entries)[0]
+
+def recommendations_for_user(username):
+    """All custom plans for a user, oldest first"""
+    return _read_recommendation_rows(_user_recommendation_entries(username))
+
+# -------------------------
+# Cohort selection (admin filters such as: bmi >= 30 and activity == 'sedentary')
+# -------------------------
+COHORT_COLUMNS = ["age", "gender", "height_cm", "weight_kg", "target_weight", "activity"] + TARGET_FIELDS
+
+def _normalize_cohort_filter(expression: str) -> str:
+    """Accept ≥/≤ and a single '=' as friendly spellings of >=, <= and =="""
+    expr = expression.replace("≥", ">=").replace("≤", "<=").replace("≠", "!=")
+    return re.sub(r"(?<![<>=!])=(?!=)", "==", expr)
+
+def select_cohort(df_users: pd.DataFrame, expression: str) -> pd.DataFrame:
+    """
+    Return the users matching a filter expression over the profile and its stored
+    targets (bmi, tdee, recommended_calories, ...). activity/gender are lowercased first.
+    """
+    frame = user_targets_frame(df_users)
+    for col in ("activity", "gender"):
+        frame[col] = frame[col].astype(str).str.strip().str.lower()
+    return frame.query(_normalize_cohort_filter(expression), engine="python")
+
 # -------------------------
 # Admin: Custom Recommendations
 # -------------------------
 @log_action
 def create_custom_recommendation():
-    ensure_recommendations()
+    ensure_recommendations_file()
     df_users = ensure_user_db()
 
     if df_users.empty:
         print("⚠️ No users available to recommend for.")
         return
 
-    print("\nAvailable Users:")
-    print(df_users[['username', 'name']].to_string(index=False))
-    username = input("\nEnter username to create recommendation for: ").strip().lower()
+    print("\nTarget: 1) Single user  2) Cohort filter")
+    mode = input("Choice [1]: ").strip() or "1"
+    if mode == "2":
+        print("Filter columns: " + ", ".join(COHORT_COLUMNS))
+        print("Example: bmi >= 30 and activity == 'sedentary'")
+        expression = read_nonempty("Cohort filter: ")
+        try:
+            cohort = select_cohort(df_users, expression)
+        except Exception as e:
+            print(f"⚠️ Invalid filter: {e}")
+            return
+        if cohort.empty:
+            print("⚠️ No users match that filter.")
+            return
+        usernames = cohort['username'].astype(str).str.lower().tolist()
+        print(f"{len(usernames)} user(s) matched.")
+    else:
+        print("\nAvailable Users:")
+        print(df_users[['username', 'name']].to_string(index=False))
+        username = input("\nEnter username to create recommendation for: ").strip().lower()
 
-    if username not in df_users['username'].str.lower().tolist():
-        print("⚠️ User not found.")
-        return
+        if username not in df_users['username'].str.lower().tolist():
+            print("⚠️ User not found.")
+            return
+        usernames = [username]
 
     print("\nEnter weekly meal recommendations (separate each day by ';'):")
     print("Example: Oatmeal+Milk; Salad+Chicken; Fish+Rice; etc.")
     plan = input("Enter meal plan for the week: ").strip()
 
-    df = pd.read_csv(RECOMMENDATIONS_FILE)
-    new = {
-        "username": username,
-        "date_created": date.today().isoformat(),
-        "recommendations": plan
-    }
-    df = pd.concat([df, pd.DataFrame([new])], ignore_index=True)
-    df.to_csv(RECOMMENDATIONS_FILE, index=False)
-    print(f"✅ Saved custom recommendation for {username}.")
+    saved = append_recommendations(usernames, plan)
+    if saved == 1:
+        print(f"✅ Saved custom recommendation for {usernames[0]}.")
+    else:
+        print(f"✅ Saved custom recommendation for {saved} users.")
     pause()
 
 
 @log_action
 def view_recommendations_for_user(username):
-    ensure_recommendations()
-    df = pd.read_csv(RECOMMENDATIONS_FILE)
-    recs = df[df['username'].str.lower() == username.lower()]
-    if recs.empty:
+    recs = recommendations_for_user(username)
+    if not recs:
         print("No custom recommendations found for this user.")
         return
     print("\n=== Custom Recommendations ===")
-    for _, row in recs.iterrows():
+    for row in recs:
         print(f"Date: {row['date_created']}")
         print(f"Plan: {row['recommendations']}")
         print("--------------------------")
 
 
+# -------------------------
+# Admin: Adherence analytics (chunked, multi-process scan of the full log)
+# -------------------------
+# Phase 1 (map): the log is split into byte ranges; each worker parses its range in
+# blocks, sums total_calories per (username, date) and spills the partial sums to
+# disk, bucketed by a stable hash of the username. Phase 2 (reduce): one worker per
+# bucket merges its spills (a day split across ranges is summed back together), joins
+# each user's stored recommended calories and computes adherence, streaks and surplus/deficit.
+# Memory per mapper is bounded by the block size and ADHERENCE_SPILL_ROWS; the number of
+# buckets grows with the log size (one per ADHERENCE_BUCKET_BYTES), so each reducer holds
+# the aggregates of a bounded slice of users no matter how few processes there are.
+ADHERENCE_BLOCK_BYTES = 32 * 1024 * 1024
+ADHERENCE_SPILL_ROWS = 1_000_000
+ADHERENCE_BUCKET_BYTES = 256 * 1024 * 1024
+
+def _user_bucket(usernames: pd.Series, buckets: int) -> np.ndarray:
+    """Stable (cross-process) hash partition of lowercase usernames"""
+    values = usernames.to_numpy(dtype=object)
+    return (pd.util.hash_array(values) % buckets).astype(int)
+
+def _iter_log_blocks(path, start, end, block_size):
+    """Yield raw line blocks for lines that *start* inside [start, end)"""
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+        f.readline()   # header, or the tail of a line owned by the previous range
+        pos = f.tell()
+        while pos < end:
+            data = f.read(max(min(block_size, end - pos), 1))
+            if not data:
+                break
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            pos = f.tell()
+            yield data
+
+def _adherence_map(task):
+    path, start, end, header, buckets, spill_dir, part, block_size = task
+    rows = 0
+    pending = []
+    pending_rows = 0
+    spills = 0
+
+    def spill():
+        nonlocal pending, pending_rows, spills
+        daily = pd.concat(pending).groupby(level=[0, 1]).sum().reset_index()
+        for b, chunk in daily.groupby(_user_bucket(daily['username'], buckets)):
+            chunk.to_pickle(os.path.join(spill_dir, f"b{b}_p{part}_{spills}.pkl"))
+        spills += 1
+        pending, pending_rows = [], 0
+
+    for block in _iter_log_blocks(path, start, end, block_size):
+        chunk = pd.read_csv(io.BytesIO(block), names=header,
+                            usecols=["date", "username", "total_calories"], dtype=str)
+        rows += len(chunk)
+        chunk['username'] = chunk['username'].str.lower()
+        chunk['total_calories'] = pd.to_numeric(chunk['total_calories'], errors='coerce').fillna(0)
+        pending.append(chunk.groupby(['username', 'date'], sort=False)['total_calories'].sum())
+        pending_rows += len(pending[-1])
+        if pending_rows >= ADHERENCE_SPILL_ROWS:
+            spill()
+    if pending:
+        spill()
+    return rows
+
+def _adherence_reduce(task):
+    spill_files, targets = task
+    if not spill_files:
+        return None
+    daily = pd.concat([pd.read_pickle(p) for p in spill_files])
+    daily = daily.groupby(['username', 'date'], as_index=False)['total_calories'].sum()
+    daily = daily.merge(targets, on='username', how='inner')
+    if daily.empty:
+        return None
+    daily['day'] = pd.to_datetime(daily['date'], errors='coerce')
+    daily = daily.dropna(subset=['day']).sort_values(['username', 'day'], ignore_index=True)
+    rec = daily['recommended_calories']
+    cal = daily['total_calories']
+    daily['within'] = (cal >= rec * (1 - ADHERENCE_BAND)) & (cal <= rec * (1 + ADHERENCE_BAND))
+    daily['diff'] = cal - rec
+    # a streak is a run of consecutive calendar days that are all within the band
+    same_user = daily['username'].eq(daily['username'].shift())
+    next_day = daily['day'].diff().eq(pd.Timedelta(days=1))
+    continues = same_user & next_day & daily['within'].shift(fill_value=False)
+    run_id = (~continues).cumsum()
+    daily['streak'] = daily['within'].astype(int).groupby(run_id).cumsum().where(daily['within'], 0)
+    g = daily.groupby('username')
+    out = pd.DataFrame({
+        "recommended_calories": g['recommended_calories'].first(),
+        "days_logged": g.size(),
+        "days_in_band": g['within'].sum(),
+        "longest_streak": g['streak'].max(),
+        "current_streak": g['streak'].last(),
+        "avg_surplus_kcal": g['diff'].mean().round(1),
+    })
+    out['adherence_pct'] = (100.0 * out['days_in_band'] / out['days_logged']).round(1)
+    return out.reset_index()
+
+def compute_adherence_report(logs_file=None, users_file=None, processes=None,
+                             block_size=None, buckets=None):
+    """
+    Return (report_df, stats) where stats has rows, seconds, rows_per_sec, processes.
+    Uses a process pool of `processes` workers (default: all cores); `buckets` (default:
+    sized from the log) sets how many user-hash partitions the reducers work through.
+    """
+    logs_file = logs_file or LOGS_FILE
+    users_file = users_file or USER_DB_FILE
+    processes = processes or os.cpu_count() or 1
+    block_size = block_size or ADHERENCE_BLOCK_BYTES
+    t0 = time.perf_counter()
+    users = user_targets_frame(pd.read_csv(users_file))
+    users = users.dropna(subset=['recommended_calories'])
+    targets = pd.DataFrame({"username": users['username'].astype(str).str.lower(),
+                            "recommended_calories": users['recommended_calories'].astype(int)})
+    targets = targets.drop_duplicates('username')
+    with open(logs_file, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]))
+    size = os.path.getsize(logs_file)
+    n_ranges = max(1, min(processes * 4, size // max(block_size // 4, 1) + 1))
+    bounds = [size * i // n_ranges for i in range(n_ranges + 1)]
+    buckets = buckets or max(processes, -(-size // ADHERENCE_BUCKET_BYTES))
+    target_buckets = _user_bucket(targets['username'], buckets)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            map_tasks = [(logs_file, bounds[i], bounds[i+1], header, buckets, spill_dir, i, block_size)
+                         for i in range(n_ranges)]
+            rows = sum(pool.map(_adherence_map, map_tasks))
+            spills = os.listdir(spill_dir)
+            reduce_tasks = [([os.path.join(spill_dir, n) for n in spills if n.startswith(f"b{b}_")],
+                             targets[target_buckets == b])
+                            for b in range(buckets)]
+            parts = [p for p in pool.map(_adherence_reduce, reduce_tasks) if p is not None]
+    columns = ["username", "recommended_calories", "days_logged", "days_in_band", "adherence_pct",
+               "longest_streak", "current_streak", "avg_surplus_kcal"]
+    report = pd.concat(parts, ignore_index=True)[columns] if parts else pd.DataFrame(columns=columns)
+    report = report.sort_values(['adherence_pct', 'username'], ascending=[False, True], ignore_index=True)
+    elapsed = time.perf_counter() - t0
+    stats = {"rows": rows, "seconds": elapsed, "processes": processes,
+             "rows_per_sec": rows / elapsed if elapsed > 0 else float('inf')}
+    return report, stats
+
+@log_action
+def adherence_report():
+    ensure_logs(); ensure_user_db()
+    report, stats = compute_adherence_report()
+    if report.empty:
+        print("No logs for registered users yet.")
+        return
+    print(f"\n=== Adherence Report (±{int(ADHERENCE_BAND*100)}% of recommended calories) ===")
+    print(report.head(20).to_string(index=False))
+    if len(report) > 20:
+        print(f"... {len(report) - 20} more user(s)")
+    path = f"adherence_report_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+    report.to_csv(path, index=False)
+    print(f"Scanned {stats['rows']:,} log rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec, {stats['processes']} processes)")
+    print(f"✅ Full report saved to {path}")
+
+
+# -------------------------
+# Session replay harness (scripted keystrokes, stubbed console)
+# -------------------------
+# A script is a list of keystroke lines fed to input() in order; an empty line is a bare
+# Enter (e.g. for pause()) and "{session}" is replaced with the session number so
+# concurrent sessions can register distinct users. While a script runs, the module-level
+# names input/print/clear_console are shadowed by a ReplayConsole, so the real menus run
+# unchanged without a terminal or the `clear` subprocess. A step is one keystroke: its
+# latency is the time from returning that key until the app asks for the next one.
+# Every script must end by choosing Exit: running out of keys while the app still asks
+# for input, or exiting with keys left over, means script and menus are out of sync and
+# the session is reported as failed.
+REPLAY_SCRIPTS = {
+    "client_day": [
+        "2", "r{session}", "Replay User {session}", "30", "Male", "175", "82", "75", "moderate", "",
+        "3", "r{session}", "y",
+        "search apple", "", "list", "", "sort calories desc", "",
+        "Apple", "", "Rice", "", "Chicken Breast", "", "done", "",
+        "6", "r{session}", "81", "", "active", "", "", "",
+        "5",
+    ],
+    "client_quick": [
+        "2", "q{session}", "Quick User {session}", "45", "Female", "162", "70", "62", "light", "",
+        "3", "q{session}", "n", "2", "n", "",
+        "5",
+    ],
+    "admin_crud": [
+        "1", "1", "",
+        "2", "Replay Food {session}", "123", "",
+        "3", "Replay Food {session}", "150", "",
+        "4", "Replay Food {session}", "",
+        "6", "",
+        "9", "",
+        "10", "5",
+    ],
+}
+
+class ReplayFinished(Exception):
+    """Raised when a replay script runs out of keystrokes"""
+
+class ReplayConsole:
+    def __init__(self, keys, session=0):
+        self.templates = list(keys)       # step labels use the unsubstituted key
+        self.keys = [k.replace("{session}", str(session)) for k in self.templates]
+        self.pos = 0
+        self.steps = []          # (label, seconds)
+        self.clears = 0
+        self.lines_out = 0
+        self._label = None
+        self._t = None
+
+    def input(self, prompt=""):
+        self._close_step()
+        if self.pos >= len(self.keys):
+            raise ReplayFinished()
+        key = self.keys[self.pos]
+        self.pos += 1
+        self._label = f"{str(prompt).strip()} {self.templates[self.pos - 1]!r}"
+        self._t = time.perf_counter()
+        return key
+
+    def _close_step(self):
+        if self._label is not None:
+            self.steps.append((self._label, time.perf_counter() - self._t))
+            self._label = None
+
+    def print(self, *args, **kwargs):
+        self.lines_out += 1
+
+    def clear(self):
+        self.clears += 1
+
+def load_replay_script(path):
+    """Read a keystroke script: one key per line, '#' lines are comments, blank = Enter"""
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if not line.startswith("#")]
+
+def _run_replay_session(task):
+    script_name, keys, session, data_dir = task
+    os.chdir(data_dir)
+    console = ReplayConsole(keys, session)
+    g = globals()
+    saved = {name: g.get(name) for name in ("input", "print", "clear_console")}
+    g["input"], g["print"], g["clear_console"] = console.input, console.print, console.clear
+    error = None
+    t0 = time.perf_counter()
+    try:
+        main_menu()
+        if console.pos < len(console.keys):
+            error = (f"app exited after key {console.pos} with "
+                     f"{len(console.keys) - console.pos} key(s) left")
+    except ReplayFinished:
+        error = f"script ended at key {console.pos} while the app was still asking for input"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        console._close_step()
+        for name, value in saved.items():
+            if value is None:
+                g.pop(name, None)
+            else:
+                g[name] = value
+    return {"script": script_name, "session": session, "steps": console.steps,
+            "seconds": time.perf_counter() - t0, "keys_used": console.pos,
+            "clears": console.clears, "error": error}
+
+def replay_sessions(scripts=None, sessions=8, processes=None, data_dir=None):
+    """
+    Run `sessions` concurrent simulated sessions (round-robin over `scripts`, a dict of
+    name -> keystroke list) against one data directory. Returns (results, step_stats_df).
+    """
+    scripts = scripts or REPLAY_SCRIPTS
+    data_dir = os.path.abspath(data_dir or os.getcwd())
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        ensure_data_files()    # seed once here, not racily from every session's main_menu()
+    finally:
+        os.chdir(cwd)
+    names = list(scripts)
+    tasks = [(names[i % len(names)], scripts[names[i % len(names)]], i, data_dir)
+             for i in range(sessions)]
+    with ProcessPoolExecutor(max_workers=processes or min(sessions, os.cpu_count() or 1)) as pool:
+        results = list(pool.map(_run_replay_session, tasks))
+    steps = pd.DataFrame([(r['script'], label, secs) for r in results for label, secs in r['steps']],
+                         columns=["script", "step", "seconds"])
+    if steps.empty:
+        return results, pd.DataFrame(columns=["script", "step", "count", "mean_ms", "p95_ms", "max_ms"])
+    ms = steps.assign(ms=steps['seconds'] * 1000).groupby(['script', 'step'])['ms']
+    stats = pd.DataFrame({"count": ms.size(), "mean_ms": ms.mean(),
+                          "p95_ms": ms.quantile(0.95), "max_ms": ms.max()}).round(2)
+    return results, stats.sort_values('p95_ms', ascending=False).reset_index()
+
+def print_replay_report(results, stats, top=15):
+    """Print the latency table and failure rate; returns the number of failed sessions"""
+    errors = [r for r in results if r['error']]
+    total = sum(r['seconds'] for r in results)
+    rate = 100 * len(errors) / len(results) if results else 0.0
+    print(f"=== Replay: {len(results)} session(s), {len(stats)} distinct steps, "
+          f"{total:.2f} s total session time ===")
+    print(f"Failed sessions: {len(errors)}/{len(results)} ({rate:.1f}%)")
+    print("Slowest menu actions (by p95):")
+    print(stats.head(top).to_string(index=False))
+    for r in errors:
+        print(f"⚠️ session {r['session']} ({r['script']}) failed after {r['keys_used']} keys: {r['error']}")
+    return len(errors)
+
+def replay_cli(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="nutriscale replay",
+                                     description="Replay keystroke scripts through the CLI menus.")
+    parser.add_argument("scripts", nargs="*", help="keystroke script files (default: built-in scripts)")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--data-dir", default=None, help="data directory (default: a scratch copy)")
+    args = parser.parse_args(argv)
+    scripts = {os.path.basename(p): load_replay_script(p) for p in args.scripts} or None
+
+    def run():
+        results, stats = replay_sessions(scripts, args.sessions, args.processes, args.data_dir)
+        return print_replay_report(results, stats)
+    failed = run() if args.data_dir else _in_scratch_dir(run)
+    return 1 if failed else 0
+
+
+# -------------------------
+# Benchmarks (python "# nutriscale_full.py" bench [name ...])
+# -------------------------
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+def _in_scratch_dir(fn):
+    """Run fn() inside a temporary working directory so the real CSVs are untouched"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            return fn()
+        finally:
+            os.chdir(cwd)
+
+def _synthetic_users(n_users, rng):
+    """Random profiles with their targets already computed, as stored by the app"""
+    df = pd.DataFrame({
+        "username": [f"user{i}" for i in range(n_users)],
+        "name": [f"User {i}" for i in range(n_users)],
+        "age": rng.integers(18, 80, n_users),
+        "gender": rng.choice(["Male", "Female", "Other"], n_users),
+        "height_cm": rng.uniform(150, 200, n_users).round(1),
+        "weight_kg": rng.uniform(45, 140, n_users).round(1),
+        "target_weight": rng.uniform(50, 100, n_users).round(1),
+        "activity": rng.choice(np.array(list(ACTIVITY_MULTIPLIERS)), n_users),
+    })
+    return _store_targets(_with_target_columns(df), df.index, TARGET_FIELDS)
+
+def benchmark_cohort_recommendations(n_users=100_000, lookups=1000):
+    def run():
+        rng = np.random.default_rng(7)
+        df_users = _synthetic_users(n_users, rng)
+        _save_user_db(df_users)
+        ensure_recommendations_file()
+        names = df_users['username'].tolist()
+
+        _, t_everyone = _timed(append_recommendations, names, "Oatmeal+Milk; Salad+Chicken")
+        cohort, t_select = _timed(select_cohort, df_users, "bmi >= 30 and activity == 'sedentary'")
+        cohort_names = cohort['username'].tolist()
+        _, t_cohort = _timed(append_recommendations, cohort_names, "Salad+Fish; Broccoli+Tofu")
+
+        # a fresh login process: nothing cached, first query opens the index cold
+        sample = [names[i] for i in rng.integers(0, n_users, lookups)]
+        _, t_cold = _timed(latest_recommendation, sample[0])
+        _, t_lookup = _timed(lambda: [latest_recommendation(u) for u in sample])
+
+        def scan_latest(u):                       # previous approach: read + filter whole CSV
+            df = pd.read_csv(RECOMMENDATIONS_FILE)
+            return df[df['username'].str.lower() == u.lower()].iloc[-1]
+        scans = min(lookups, 5)
+        _, t_scan = _timed(lambda: [scan_latest(u) for u in sample[:scans]])
+        _, t_single = _timed(append_recommendations, [names[0]], "Oats; Eggs")
+
+        print(f"=== Cohort recommendations @ {n_users:,} users ===")
+        print(f"bulk append (all users):   {t_everyone*1000:9.1f} ms")
+        print(f"cohort select:             {t_select*1000:9.1f} ms  ({len(cohort_names):,} matched)")
+        print(f"bulk append (cohort):      {t_cohort*1000:9.1f} ms")
+        print(f"single-user append:        {t_single*1000:9.1f} ms")
+        print(f"first lookup (cold index): {t_cold*1000:9.1f} ms")
+        print(f"latest plan via index:     {t_lookup/lookups*1e6:9.1f} µs/lookup")
+        print(f"latest plan via CSV scan:  {t_scan/scans*1e6:9.1f} µs/lookup")
+    _in_scratch_dir(run)
+
+def benchmark_adherence(n_rows=2_000_000, n_users=20_000):
+    def run():
+        rng = np.random.default_rng(11)
+        _save_user_db(_synthetic_users(n_users, rng))
+        days = pd.date_range("2024-01-01", periods=max(1, n_rows // n_users)).strftime("%Y-%m-%d")
+        logs = pd.DataFrame({
+            "date": np.repeat(days.to_numpy(), n_users)[:n_rows],
+            "username": np.tile([f"user{i}" for i in range(n_users)], len(days))[:n_rows],
+            "foods": "Oatmeal(150kcal); Eggs(155kcal); Rice(180kcal)",
+            "total_calories": rng.integers(1200, 3500, n_rows),
+            "weight": "",
+        })
+        logs.to_csv(LOGS_FILE, index=False)
+        size_mb = os.path.getsize(LOGS_FILE) / 1e6
+        print(f"=== Adherence report @ {n_rows:,} log rows ({size_mb:.0f} MB), {n_users:,} users ===")
+        cores = os.cpu_count() or 1
+        for procs in sorted({1, max(1, cores // 2), cores}):
+            report, stats = compute_adherence_report(processes=procs)
+            print(f"{procs:3d} process(es): {stats['seconds']:7.2f} s  "
+                  f"{stats['rows_per_sec']:12,.0f} rows/sec  ({len(report):,} users)")
+    _in_scratch_dir(run)
+
+def benchmark_food_catalog(n_foods=1_000_000, lookups=10_000):
+    def run():
+        rng = np.random.default_rng(5)
+        pd.DataFrame({"Food": [f"Food Item {i}" for i in range(n_foods)],
+                      "Calories": rng.integers(0, 900, n_foods)}).to_csv(FOOD_DB_FILE, index=False)
+        df, t_csv = _timed(pd.read_csv, FOOD_DB_FILE)
+        _, t_compile = _timed(compile_food_catalog)
+        catalog, t_open = _timed(food_catalog)             # what every process does at startup
+        _, t_frame = _timed(catalog.to_frame)
+        ids = rng.integers(0, n_foods, lookups)
+        names = [f"food item {i}" for i in ids]
+        _, t_by_id = _timed(lambda: [catalog.get(int(i)) for i in ids])
+        found, t_by_name = _timed(lambda: [catalog.lookup(n) for n in names])
+        assert all(f is not None for f in found)
+        by_name = df['Food'].str.lower()
+        scans = min(lookups, 20)
+        _, t_df_name = _timed(lambda: [df.loc[by_name == n].iloc[0] for n in names[:scans]])
+        catalog = None
+        release_food_catalog()
+        print(f"=== Food catalog @ {n_foods:,} foods "
+              f"(CSV {os.path.getsize(FOOD_DB_FILE)/1e6:.1f} MB, "
+              f"binary {os.path.getsize(FOOD_CATALOG_BIN_FILE)/1e6:.1f} MB) ===")
+        print(f"pd.read_csv:               {t_csv*1000:9.1f} ms")
+        print(f"compile binary (one-off):  {t_compile*1000:9.1f} ms")
+        print(f"startup open via mmap:     {t_open*1000:9.3f} ms")
+        print(f"to_frame from mmap:        {t_frame*1000:9.1f} ms")
+        print(f"lookup by id (mmap):       {t_by_id/lookups*1e6:9.2f} µs")
+        print(f"lookup by name (mmap):     {t_by_name/lookups*1e6:9.2f} µs")
+        print(f"lookup by name (DataFrame):{t_df_name/scans*1e6:9.0f} µs (mask scan)")
+    _in_scratch_dir(run)
+
+def benchmark_suggestions(n_foods=100_000, trials=300):
+    """Login suggestions: budget adherence on a large catalog + exactness vs brute force"""
+    rng = np.random.default_rng(11)
+    food_df = pd.DataFrame({"Food": [f"Food {i}" for i in range(n_foods)],
+                            "Calories": rng.integers(0, 900, n_foods)})
+    print(f"=== Suggestions (k={SUGGESTION_COUNT}, budget {SUGGESTION_BUDGET_MS} ms) ===")
+    for n in (SUGGESTION_MAX_CANDIDATES, n_foods):
+        (combos, proven), secs = _timed(recommend_foods_top_k, 2300, food_df.head(n),
+                                        k=SUGGESTION_COUNT, budget_ms=SUGGESTION_BUDGET_MS)
+        devs = [abs(sum(c for _, c in combo) - 2300) for combo in combos]
+        print(f"{n:>9,} foods: {secs*1000:7.1f} ms  proven={proven}  deviations={devs}")
+    mismatches = check_top_k_against_brute_force(trials)
+    print(f"brute-force check: {mismatches}/{trials} mismatches")
+    return 1 if mismatches else 0
+
+def benchmark_replay(sessions=8):
+    def run():
+        results, stats = replay_sessions(sessions=sessions)
+        return print_replay_report(results, stats, top=10)
+    return 1 if _in_scratch_dir(run) else 0
+
+BENCHMARKS = {
+    "cohort": benchmark_cohort_recommendations,
+    "adherence": benchmark_adherence,
+    "catalog": benchmark_food_catalog,
+    "suggestions": benchmark_suggestions,
+    "replay": benchmark_replay,
+}
+
+def run_benchmarks(names):
+    """Run the named benchmarks; returns a non-zero exit status if any of them failed"""
+    status = 0
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            status = 2
+            continue
+        status = BENCHMARKS[name]() or status
+    return status
+
+
 # -------------------------
 # Main menu
 # -------------------------
+def ensure_data_files():
+    """Create/upgrade every data file the menus read (foods, catalog, users, logs, recommendations)"""
+    food_catalog(); backfill_user_targets(); ensure_logs(); ensure_recommendations_file()
+
 def main_menu():
-    ensure_food_db(); ensure_user_db(); ensure_logs()
+    ensure_data_files()
     while True:
         clear_console()
         print("=== NUTRISCALE MANAGEMENT PORTAL ===")
@@ -783,6 +2275,7 @@ def main_menu():
         print("3. Client Login")
         print("4. Export My Logs (client must enter username)")
         print("5. Exit")
+        print("6. Edit My Profile")
         choice = input("Enter choice: ").strip()
         if choice == "1":
             admin_portal()
@@ -798,6 +2291,8 @@ def main_menu():
         elif choice == "5":
             print("Goodbye — stay consistent!")
             break
+        elif choice == "6":
+            edit_profile_flow()
         else:
             print("Invalid choice.")
             pause()
@@ -806,6 +2301,10 @@ def main_menu():
 # Run
 # -------------------------
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        sys.exit(run_benchmarks(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        sys.exit(replay_cli(sys.argv[2:]))
     try:
         main_menu()
     except KeyboardInterrupt: